@@ -5,8 +5,8 @@ a = Analysis(
     ['gui.py'],
     pathex=[],
     binaries=[],
-    datas=[('price_monitor.py', '.'), ('generated-icon.svg', '.')],
-    hiddenimports=['tkinter', 'requests', 'bs4', 'trafilatura'],
+    datas=[('price_monitor.py', '.'), ('http_client.py', '.'), ('config.py', '.'), ('monitor_state.py', '.'), ('price_history.py', '.'), ('product_store.py', '.'), ('price_selectors.py', '.'), ('generated-icon.svg', '.')],
+    hiddenimports=['tkinter', 'requests', 'bs4', 'soupsieve', 'trafilatura'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
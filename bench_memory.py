@@ -0,0 +1,89 @@
+import sys
+import time
+import tracemalloc
+
+from product_store import ProductCatalog
+
+PRODUCT_COUNT = 100_000
+CHECK_INTERVAL = 60
+
+
+class DictProductState:
+    """The previous per-product state layout: a regular object with an instance __dict__"""
+
+    def __init__(self, last_price=None, in_stock=None, last_check=None, next_due=0.0, etag=None, failures=0):
+        self.last_price = last_price
+        self.in_stock = in_stock
+        self.last_check = last_check
+        self.next_due = next_due
+        self.etag = etag
+        self.failures = failures
+
+
+def make_url(i):
+    return f"https://www.amazon.de/dp/B{i:09d}"
+
+
+def build_dict_layout(count, now):
+    products = [{'url': make_url(i), 'target_price': 10.0 + i % 100} for i in range(count)]
+    states = {
+        product['url']: DictProductState(last_price=20.0 + i % 50, in_stock=True, last_check=now,
+                                         next_due=now + i % CHECK_INTERVAL)
+        for i, product in enumerate(products)
+    }
+    return products, states
+
+
+def build_compact_layout(count, now):
+    catalog = ProductCatalog()
+    for i in range(count):
+        state = catalog.add(make_url(i), 10.0 + i % 100).state
+        state.last_price = 20.0 + i % 50
+        state.in_stock = True
+        state.last_check = now
+        state.next_due = now + i % CHECK_INTERVAL
+    catalog.reschedule_all()
+    return catalog
+
+
+def measure(build, *args):
+    """Run build and return (result, bytes still allocated, seconds)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else PRODUCT_COUNT
+    now = time.time()
+
+    (products, states), dict_bytes, dict_build = measure(build_dict_layout, count, now)
+    catalog, compact_bytes, compact_build = measure(build_compact_layout, count, now)
+
+    print(f"Products: {count:,}")
+    print(f"Dict layout:    {dict_bytes / 1e6:8.1f} MB  ({dict_bytes / count:6.0f} B/product, built in {dict_build:.2f}s)")
+    print(f"Compact layout: {compact_bytes / 1e6:8.1f} MB  ({compact_bytes / count:6.0f} B/product, built in {compact_build:.2f}s)")
+    print(f"Memory saved:   {(1 - compact_bytes / dict_bytes):.0%}")
+
+    # One scheduler tick: find the products due in the next second
+    tick = now + 1
+    start = time.perf_counter()
+    scanned = [product for product in products if states[product['url']].next_due <= tick]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    popped = catalog.pop_due(tick)
+    heap_time = time.perf_counter() - start
+
+    print(f"\nScheduler tick ({len(popped):,} of {count:,} due)")
+    print(f"Full scan:      {scan_time * 1000:8.2f} ms")
+    print(f"Due-time heap:  {heap_time * 1000:8.2f} ms")
+    assert len(scanned) == len(popped)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,18 @@ PyInstaller.__main__.run([
     '--windowed',  # Don't show console window
     '--name=AmazonPriceMonitor',  # Name of the executable
     '--add-data=price_monitor.py:.',  # Include price_monitor.py
+    '--add-data=http_client.py:.',  # Include http_client.py
+    '--add-data=config.py:.',  # Include config.py
+    '--add-data=monitor_state.py:.',  # Include monitor_state.py
+    '--add-data=price_history.py:.',  # Include price_history.py
+    '--add-data=product_store.py:.',  # Include product_store.py
+    '--add-data=price_selectors.py:.',  # Include price_selectors.py
     '--add-data=generated-icon.svg:.',  # Include the icon
     '--icon=generated-icon.svg',  # Set application icon
     '--clean',  # Clean PyInstaller cache
     '--hidden-import=tkinter',
     '--hidden-import=requests',
     '--hidden-import=bs4',
+    '--hidden-import=soupsieve',
     '--hidden-import=trafilatura',
 ])
\ No newline at end of file
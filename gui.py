@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
 from price_monitor import AmazonPriceMonitor
+from product_store import ProductCatalog
 import logging
 import queue
 import json
@@ -269,18 +270,18 @@ class AmazonMonitorGUI:
         try:
             if os.path.exists('products.json'):
                 with open('products.json', 'r') as f:
-                    self.products = json.load(f)
+                    self.products = ProductCatalog.from_list(json.load(f))
             else:
-                self.products = []
+                self.products = ProductCatalog()
             self.update_products_display()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load products: {str(e)}")
-            self.products = []
+            self.products = ProductCatalog()
 
     def save_products(self):
         try:
             with open('products.json', 'w') as f:
-                json.dump(self.products, f)
+                json.dump(self.products.to_list(), f)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save products: {str(e)}")
 
@@ -300,7 +301,7 @@ class AmazonMonitorGUI:
             messagebox.showerror("Error", "Invalid price format. Please enter a positive number")
             return
 
-        self.products.append({"url": url, "target_price": price})
+        self.products.add(url, price)
         self.save_products()
         self.update_products_display()
 
@@ -312,11 +313,11 @@ class AmazonMonitorGUI:
         self.products_text.delete('1.0', tk.END)
         for i, product in enumerate(self.products, 1):
             self.products_text.insert(tk.END, 
-                f"{i}. URL: {product['url']}\n   Target Price: €{product['target_price']:.2f}\n\n")
+                f"{i}. URL: {product.url}\n   Target Price: €{product.target_price:.2f}\n\n")
 
     def clear_products(self):
         if messagebox.askyesno("Confirm", "Are you sure you want to clear all products?"):
-            self.products = []
+            self.products = ProductCatalog()
             self.save_products()
             self.update_products_display()
 
@@ -0,0 +1,212 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 support is optional
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Put on the idle queue by SessionPool.close() to wake callers waiting for a session
+_CLOSED = object()
+
+# Responses that mean Amazon is throttling the identity behind a session
+THROTTLE_STATUS_CODES = {429, 503}
+CAPTCHA_MARKERS = ('/errors/validateCaptcha', 'Type the characters you see in this image')
+
+
+def is_throttled(response):
+    """Check whether a response is a rate limit or captcha page"""
+    if response.status_code in THROTTLE_STATUS_CODES:
+        return True
+    return any(marker in response.text for marker in CAPTCHA_MARKERS)
+
+
+class SessionHealth:
+    """Request outcome counters for a single pooled session"""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.throttles = 0
+        self.consecutive_throttles = 0
+        self.created_at = time.time()
+
+    def record_success(self):
+        self.requests += 1
+        self.consecutive_throttles = 0
+
+    def record_throttle(self):
+        self.requests += 1
+        self.throttles += 1
+        self.consecutive_throttles += 1
+
+    def record_failure(self):
+        self.requests += 1
+        self.failures += 1
+
+    @property
+    def failure_rate(self):
+        if not self.requests:
+            return 0.0
+        return (self.failures + self.throttles) / self.requests
+
+    def should_retire(self, max_throttles, max_failure_rate, min_requests=10):
+        """Decide whether this session's identity is burned"""
+        if self.consecutive_throttles >= max_throttles:
+            return True
+        return self.requests >= min_requests and self.failure_rate >= max_failure_rate
+
+
+class PooledSession:
+    """One HTTP identity: a header profile, an optional proxy and its own connection pool"""
+
+    def __init__(self, session_id, headers, proxy=None, pool_size=config.CONNECTION_POOL_SIZE, http2=False):
+        self.session_id = session_id
+        self.proxy = proxy
+        self.health = SessionHealth()
+        self.http2 = http2 and httpx is not None
+
+        if self.http2:
+            limits = httpx.Limits(max_keepalive_connections=pool_size)
+            self.client = httpx.Client(
+                http2=True,
+                headers=headers,
+                proxy=proxy,
+                limits=limits,
+                follow_redirects=True
+            )
+        else:
+            self.client = requests.Session()
+            self.client.headers.update(headers)
+            adapter = HTTPAdapter(pool_maxsize=pool_size)
+            self.client.mount('https://', adapter)
+            self.client.mount('http://', adapter)
+            if proxy:
+                self.client.proxies.update({'http': proxy, 'https': proxy})
+
+    def get(self, url, timeout=10, headers=None):
+        """Fetch a URL, always returning a requests.Response"""
+        if not self.http2:
+            return self.client.get(url, timeout=timeout, headers=headers)
+
+        try:
+            response = self.client.get(url, timeout=timeout, headers=headers)
+        except httpx.HTTPError as e:
+            # Surface transport errors the same way requests does so callers need one except clause
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return self._to_requests_response(response)
+
+    @staticmethod
+    def _to_requests_response(response):
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.headers.update(response.headers)
+        converted.url = str(response.url)
+        converted.reason = response.reason_phrase
+        converted.encoding = response.encoding
+        converted._content = response.content
+        return converted
+
+    def close(self):
+        self.client.close()
+
+
+class SessionPool:
+    """Thread-safe pool of sessions with rotating identities and automatic retirement"""
+
+    def __init__(self, size=config.SESSION_POOL_SIZE, header_profiles=None, proxies=None,
+                 pool_size=config.CONNECTION_POOL_SIZE, http2=config.USE_HTTP2,
+                 max_throttles=config.MAX_SESSION_THROTTLES,
+                 max_failure_rate=config.MAX_SESSION_FAILURE_RATE):
+        if http2 and httpx is None:
+            logger.warning("HTTP/2 requested but httpx is not installed, falling back to HTTP/1.1")
+
+        self.pool_size = pool_size
+        self.http2 = http2
+        self.max_throttles = max_throttles
+        self.max_failure_rate = max_failure_rate
+        self.retired_count = 0
+
+        self._profiles = itertools.cycle(header_profiles or config.HEADER_PROFILES)
+        self._proxies = itertools.cycle(proxies or config.PROXIES or [None])
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._closed = False
+
+        for _ in range(size):
+            self._idle.put(self._new_session())
+
+    def _new_session(self):
+        with self._lock:
+            headers = next(self._profiles)
+            proxy = next(self._proxies)
+            session_id = next(self._ids)
+        return PooledSession(session_id, headers, proxy=proxy, pool_size=self.pool_size, http2=self.http2)
+
+    def get(self, url, timeout=10, headers=None):
+        """Fetch a URL through the next idle session, recording how the session fared"""
+        if self._closed:
+            raise RuntimeError("Session pool is closed")
+        session = self._idle.get()
+        if session is _CLOSED:
+            self._idle.put(_CLOSED)  # Pass the wake-up on to the next waiting caller
+            raise RuntimeError("Session pool is closed")
+        try:
+            response = session.get(url, timeout=timeout, headers=headers)
+        except Exception:
+            session.health.record_failure()
+            raise
+        else:
+            if is_throttled(response):
+                session.health.record_throttle()
+                logger.warning(f"Session {session.session_id} throttled (HTTP {response.status_code})")
+            else:
+                session.health.record_success()
+            return response
+        finally:
+            self._release(session)
+
+    def _release(self, session):
+        if self._closed:
+            session.close()
+            return
+        if session.health.should_retire(self.max_throttles, self.max_failure_rate):
+            # Create the replacement first so a failure cannot shrink the pool
+            try:
+                replacement = self._new_session()
+            except Exception as e:
+                logger.error(f"Failed to replace session {session.session_id}, keeping it: {e}")
+                self._idle.put(session)
+                return
+            logger.info(
+                f"Retiring session {session.session_id} after {session.health.requests} requests "
+                f"({session.health.throttles} throttled, {session.health.failures} failed)"
+            )
+            session.close()
+            with self._lock:
+                self.retired_count += 1
+            session = replacement
+        self._idle.put(session)
+
+    def close(self):
+        """Close all idle sessions; sessions still in use are closed when released"""
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if session is not _CLOSED:
+                session.close()
+        self._idle.put(_CLOSED)
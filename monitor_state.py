@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class ProductState:
+    """Runtime state for one monitored product, kept across restarts"""
+
+    FIELDS = ('last_price', 'in_stock', 'last_check', 'next_due', 'etag', 'failures')
+    __slots__ = FIELDS  # No per-instance __dict__; keeps large watchlists small
+
+    def __init__(self, last_price=None, in_stock=None, last_check=None, next_due=0.0, etag=None, failures=0):
+        self.last_price = last_price
+        self.in_stock = in_stock
+        self.last_check = last_check
+        self.next_due = next_due
+        self.etag = etag
+        self.failures = failures
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+
+class StateStore:
+    """Atomic JSON checkpoint of per-product state, keyed by product URL; a path of None disables it"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Load saved states; a missing or corrupt checkpoint means a cold start"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return {url: ProductState.from_dict(state) for url, state in data.get('products', {}).items()}
+        except Exception as e:
+            logger.error(f"Failed to load monitor state, starting cold: {e}")
+            return {}
+
+    def save(self, states):
+        """Write all states to a temporary file and atomically swap it into place"""
+        if not self.path:
+            return
+        data = {'products': {url: state.to_dict() for url, state in states.items()}}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.monitor_state-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save monitor state: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
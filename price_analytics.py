@@ -0,0 +1,204 @@
+import sys
+import time
+import logging
+
+import numpy as np
+
+import config
+from price_history import PriceHistory
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def _group_mean(keys, values, size):
+    """Mean of values per integer key, NaN where a key has no values"""
+    totals = np.bincount(keys, weights=values, minlength=size)
+    counts = np.bincount(keys, minlength=size)
+    return np.divide(totals, counts, out=np.full(size, np.nan), where=counts > 0)
+
+
+def _local_offsets(timestamps):
+    """UTC offset of the local time zone at each timestamp, following daylight saving changes"""
+    # Offsets only change at zone transitions, which fall on quarter hours; look each one up once
+    quarters, inverse = np.unique(timestamps // 900, return_inverse=True)
+    offsets = np.array([time.localtime(quarter * 900).tm_gmtoff for quarter in quarters], dtype=np.float64)
+    return offsets[inverse.ravel()]
+
+
+def _nan_argmin_rows(matrix):
+    """Row-wise argmin ignoring NaN; -1 for rows without data"""
+    filled = np.where(np.isnan(matrix), np.inf, matrix)
+    best = np.argmin(filled, axis=1)
+    best[np.isinf(filled.min(axis=1))] = -1
+    return best
+
+
+class PriceAnalytics:
+    """Vectorized price statistics for every product in the history, computed in one pass"""
+
+    def __init__(self, timestamps, urls, prices, window_days=config.ANALYTICS_WINDOW_DAYS,
+                 percentiles=(10, 25, 50), now=None, utc_offset=None):
+        now = time.time() if now is None else now
+        self.window_days = window_days
+        self.percentiles = tuple(percentiles)
+
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        self.urls, codes = np.unique(np.asarray(urls, dtype=object), return_inverse=True)
+        self._index = {url: i for i, url in enumerate(self.urls)}
+        n = len(self.urls)
+
+        # Group observations per product in time order
+        order = np.lexsort((timestamps, codes))
+        codes, timestamps, prices = codes[order], timestamps[order], prices[order]
+        self.observations = np.bincount(codes, minlength=n)
+        self._ends = np.cumsum(self.observations)
+        self._starts = self._ends - self.observations
+
+        if n == 0:
+            self._sorted_prices = prices
+            empty = np.empty(0)
+            self.current_price = self.first_seen = self.last_seen = empty
+            self.all_time_min = self.window_min = self.mean_price = self.current_percentile = empty
+            self.drops = np.empty(0, dtype=np.int64)
+            self.drop_frequency = self.drops_per_day = self.mean_drop_pct = empty
+            self.percentile_values = np.empty((0, len(self.percentiles)))
+            self.drops_by_hour = np.empty((0, 24), dtype=np.int64)
+            self.drops_by_weekday = np.empty((0, 7), dtype=np.int64)
+            self.relative_price_by_hour = np.empty((0, 24))
+            self.relative_price_by_weekday = np.empty((0, 7))
+            self.cheapest_hour = self.cheapest_weekday = np.empty(0, dtype=np.int64)
+            return
+
+        last = self._ends - 1
+        self.current_price = prices[last]
+        self.first_seen = timestamps[self._starts]
+        self.last_seen = timestamps[last]
+        self.all_time_min = np.minimum.reduceat(prices, self._starts)
+        self.mean_price = np.bincount(codes, weights=prices, minlength=n) / self.observations
+
+        # Minimum over the trailing window; NaN when a product has no recent observations
+        recent = np.where(timestamps >= now - window_days * SECONDS_PER_DAY, prices, np.inf)
+        window_min = np.minimum.reduceat(recent, self._starts)
+        self.window_min = np.where(np.isinf(window_min), np.nan, window_min)
+
+        # Percentiles by linear interpolation inside each product's sorted price run
+        self._sorted_prices = prices[np.lexsort((prices, codes))]
+        positions = self._starts[:, None] + (self.observations[:, None] - 1) * (np.asarray(self.percentiles) / 100.0)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.ceil(positions).astype(np.int64)
+        fraction = positions - lower
+        self.percentile_values = (
+            self._sorted_prices[lower] + (self._sorted_prices[upper] - self._sorted_prices[lower]) * fraction
+        )
+
+        # Share of observations at or below the current price (low = good deal)
+        at_or_below = prices <= self.current_price[codes]
+        self.current_percentile = np.bincount(codes, weights=at_or_below, minlength=n) / self.observations * 100
+
+        # Price drops between consecutive observations of the same product
+        same_product = codes[1:] == codes[:-1]
+        is_drop = same_product & (prices[1:] < prices[:-1])
+        drop_codes = codes[1:][is_drop]
+        self.drops = np.bincount(drop_codes, minlength=n)
+        # Share of price changes that were drops; unchanged consecutive prices are not changes
+        changes = np.bincount(codes[1:][same_product & (prices[1:] != prices[:-1])], minlength=n)
+        self.drop_frequency = np.divide(self.drops, changes, out=np.zeros(n), where=changes > 0)
+        span_days = (self.last_seen - self.first_seen) / SECONDS_PER_DAY
+        self.drops_per_day = np.divide(self.drops, span_days, out=np.zeros(n), where=span_days > 0)
+        drop_sizes = (prices[:-1][is_drop] - prices[1:][is_drop]) / prices[:-1][is_drop] * 100
+        self.mean_drop_pct = _group_mean(drop_codes, drop_sizes, n)
+
+        # Time-of-day / day-of-week patterns in local time, or at a fixed utc_offset if one is given
+        local = timestamps + (_local_offsets(timestamps) if utc_offset is None else utc_offset)
+        hours = (local // 3600 % 24).astype(np.int64)
+        weekdays = ((local // SECONDS_PER_DAY + 3) % 7).astype(np.int64)  # 1970-01-01 was a Thursday
+        drop_hours = hours[1:][is_drop]
+        drop_weekdays = weekdays[1:][is_drop]
+        self.drops_by_hour = np.bincount(drop_codes * 24 + drop_hours, minlength=n * 24).reshape(n, 24)
+        self.drops_by_weekday = np.bincount(drop_codes * 7 + drop_weekdays, minlength=n * 7).reshape(n, 7)
+
+        relative = prices / self.mean_price[codes]
+        self.relative_price_by_hour = _group_mean(codes * 24 + hours, relative, n * 24).reshape(n, 24)
+        self.relative_price_by_weekday = _group_mean(codes * 7 + weekdays, relative, n * 7).reshape(n, 7)
+        self.cheapest_hour = _nan_argmin_rows(self.relative_price_by_hour)
+        self.cheapest_weekday = _nan_argmin_rows(self.relative_price_by_weekday)
+
+    @classmethod
+    def from_history(cls, history, **kwargs):
+        """Build analytics from a PriceHistory"""
+        observations = history.load()
+        if not observations:
+            return cls([], [], [], **kwargs)
+        timestamps, urls, prices, _ = zip(*observations)
+        return cls(timestamps, urls, prices, **kwargs)
+
+    def __contains__(self, url):
+        return url in self._index
+
+    def price_percentile(self, url, price):
+        """Percentage of recorded prices for a product at or below the given price"""
+        i = self._index[url]
+        history = self._sorted_prices[self._starts[i]:self._ends[i]]
+        return np.searchsorted(history, price, side='right') / len(history) * 100
+
+    def is_good_price(self, url, price, max_percentile=25, min_observations=10):
+        """Check whether a price is unusually low compared to the product's own history"""
+        if url not in self._index:
+            return False
+        i = self._index[url]
+        if self.observations[i] < min_observations:
+            return False
+        if not np.isnan(self.window_min[i]) and price <= self.window_min[i]:
+            return True
+        return self.price_percentile(url, price) <= max_percentile
+
+    def stats(self, url):
+        """All statistics for one product as a plain dict"""
+        i = self._index[url]
+        return {
+            'url': url,
+            'observations': int(self.observations[i]),
+            'current_price': float(self.current_price[i]),
+            'current_percentile': float(self.current_percentile[i]),
+            'all_time_min': float(self.all_time_min[i]),
+            'window_min': float(self.window_min[i]),
+            'mean_price': float(self.mean_price[i]),
+            'percentiles': {q: float(v) for q, v in zip(self.percentiles, self.percentile_values[i])},
+            'drops': int(self.drops[i]),
+            'drop_frequency': float(self.drop_frequency[i]),
+            'drops_per_day': float(self.drops_per_day[i]),
+            'mean_drop_pct': float(self.mean_drop_pct[i]),
+            'drops_by_hour': self.drops_by_hour[i].tolist(),
+            'drops_by_weekday': self.drops_by_weekday[i].tolist(),
+            'cheapest_hour': int(self.cheapest_hour[i]),
+            'cheapest_weekday': int(self.cheapest_weekday[i]),
+        }
+
+    def report(self):
+        """Human-readable summary of every product, best deals first"""
+        lines = [f"Price report for {len(self.urls)} products ({self.window_days}-day window)"]
+        for i in np.argsort(self.current_percentile, kind='stable'):
+            percentiles = ', '.join(f"p{q}: €{v:.2f}" for q, v in zip(self.percentiles, self.percentile_values[i]))
+            hour = f"{self.cheapest_hour[i]:02d}:00" if self.cheapest_hour[i] >= 0 else "-"
+            weekday = WEEKDAY_NAMES[self.cheapest_weekday[i]] if self.cheapest_weekday[i] >= 0 else "-"
+            window_min = f"€{self.window_min[i]:.2f}" if not np.isnan(self.window_min[i]) else "-"
+            lines.append(
+                f"\n{self.urls[i]}\n"
+                f"   Current: €{self.current_price[i]:.2f} (percentile {self.current_percentile[i]:.0f}), "
+                f"min: €{self.all_time_min[i]:.2f}, {self.window_days}-day min: {window_min}, "
+                f"mean: €{self.mean_price[i]:.2f}\n"
+                f"   {percentiles}\n"
+                f"   Drops: {self.drops[i]} ({self.drop_frequency[i]:.0%} of changes, "
+                f"{self.drops_per_day[i]:.2f}/day), cheapest at {hour} on {weekday}"
+            )
+        return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else config.HISTORY_FILE
+    analytics = PriceAnalytics.from_history(PriceHistory(path))
+    print(analytics.report())
@@ -0,0 +1,47 @@
+import csv
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = ['timestamp', 'url', 'price', 'in_stock']
+
+
+class PriceHistory:
+    """Append-only CSV log of every observed price"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, url, price, in_stock, timestamp):
+        """Append one observation"""
+        with self._lock:
+            try:
+                write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                with open(self.path, 'a', newline='') as f:
+                    writer = csv.writer(f)
+                    if write_header:
+                        writer.writerow(FIELDNAMES)
+                    writer.writerow([f"{timestamp:.3f}", url, f"{price:.2f}", int(bool(in_stock))])
+            except Exception as e:
+                logger.error(f"Failed to record price history: {e}")
+
+    def load(self):
+        """Read all observations as (timestamp, url, price, in_stock) tuples"""
+        if not os.path.exists(self.path):
+            return []
+        observations = []
+        with open(self.path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    observations.append((
+                        float(row['timestamp']),
+                        row['url'],
+                        float(row['price']),
+                        row['in_stock'] == '1'
+                    ))
+                except (KeyError, TypeError, ValueError):
+                    continue  # Skip rows truncated by a crash mid-write
+        return observations
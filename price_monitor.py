@@ -2,9 +2,16 @@ import requests
 from bs4 import BeautifulSoup
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import sys
 import logging
+import config
+from http_client import SessionPool, is_throttled
+from monitor_state import ProductState, StateStore
+from price_history import PriceHistory
+from product_store import ProductCatalog
+from price_selectors import SelectorRanker, STOCK_SELECTORS, compile_selectors, marketplace_for
 
 # Set up logging with more detailed configuration
 logging.basicConfig(
@@ -18,67 +25,34 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class AmazonPriceMonitor:
-    def __init__(self):
-        self.session = requests.Session()
-        self.setup_headers()
-        self.products = []  # Will be set by GUI
+    def __init__(self, client=None, state_path=config.STATE_FILE, history_path=config.HISTORY_FILE):
+        self.client = client or SessionPool()  # Pooled, thread-safe sessions with rotating identities
+        self.products = ProductCatalog()  # Will be set by GUI
         self.stop_monitoring = False  # Flag to stop monitoring
+        self.check_interval = config.CHECK_INTERVAL  # seconds between checks of one product
+        self.state_store = StateStore(state_path)
+        self.history = PriceHistory(history_path)
+        self.price_selectors = SelectorRanker()  # Compiled once, reordered by hit rate per marketplace
+        self.stock_selectors = compile_selectors(STOCK_SELECTORS)
 
-    def setup_headers(self):
-        """Setup headers to better mimic a real browser request"""
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0'
-        })
-
-    def extract_price(self, html_content):
+    def extract_price(self, html_content, url=None):
         """Extract price from Amazon product page"""
         soup = BeautifulSoup(html_content, 'html.parser')
         logger.debug("Attempting to extract price from page...")
+        marketplace = marketplace_for(url)
 
-        # Try multiple price selectors that Amazon commonly uses
-        price_selectors = [
-            '.a-price .a-offscreen',
-            '#priceblock_ourprice',
-            '#priceblock_dealprice',
-            '.a-price .a-price-whole',
-            '#corePrice_feature_div .a-price-whole',
-            '#price_inside_buybox',
-            '.a-size-medium.a-color-price',
-            '.price3P',
-            '#sns-base-price'
-        ]
-
-        for selector in price_selectors:
-            price_element = soup.select_one(selector)
-            if price_element:
-                price_text = price_element.get_text().strip()
-                logger.debug(f"Found price element with selector '{selector}': {price_text}")
-                # Extract number from price text (e.g., "€299.99" or "299,99 €" -> 299.99)
-                price_text = price_text.replace(',', '.')  # Convert European decimal separator
-                price_match = re.search(r'\d+[.,]?\d*', price_text)
-                if price_match:
-                    try:
-                        return float(price_match.group())
-                    except ValueError as e:
-                        logger.debug(f"Failed to convert price text '{price_text}' to float: {e}")
-                        continue
+        # Try the selectors that found prices on this marketplace most often first
+        selector, price = self.price_selectors.find(soup, marketplace, self.parse_price_element)
+        if selector is not None:
+            self.price_selectors.record(marketplace, selector)
+            return price
 
+        self.price_selectors.record(marketplace, None)
         logger.debug("Standard price selectors failed, attempting trafilatura extraction...")
         # If we couldn't find the price with any selector, try using trafilatura
         try:
             import trafilatura
-            downloaded = trafilatura.fetch_url(self.products[0]['url'])
+            downloaded = trafilatura.fetch_url(url or self.products[0].url)
             text = trafilatura.extract(downloaded)
             if text:
                 # Look for price patterns in the extracted text (both € and EUR formats)
@@ -94,21 +68,29 @@ class AmazonPriceMonitor:
 
         raise ValueError("Could not find price element on the page after trying multiple methods")
 
+    def parse_price_element(self, selector, price_element):
+        """Get the price from a matched element, or None if it holds no usable number"""
+        if not price_element:
+            return None
+        price_text = price_element.get_text().strip()
+        logger.debug(f"Found price element with selector '{selector}': {price_text}")
+        # Extract number from price text (e.g., "€299.99" or "299,99 €" -> 299.99)
+        price_text = price_text.replace(',', '.')  # Convert European decimal separator
+        price_match = re.search(r'\d+[.,]?\d*', price_text)
+        if price_match:
+            try:
+                return float(price_match.group())
+            except ValueError as e:
+                logger.debug(f"Failed to convert price text '{price_text}' to float: {e}")
+        return None
+
     def check_stock(self, html_content):
         """Check if the product is in stock"""
         soup = BeautifulSoup(html_content, 'html.parser')
         logger.debug("Checking stock status...")
 
-        # Multiple stock status selectors
-        stock_selectors = [
-            '#availability',
-            '#outOfStock',
-            '#availability-string',
-            '#buybox-availability'
-        ]
-
-        for selector in stock_selectors:
-            element = soup.select_one(selector)
+        for selector, compiled in self.stock_selectors:
+            element = compiled.select_one(soup)
             if element:
                 text = element.get_text().strip().lower()
                 logger.debug(f"Found stock information with selector '{selector}': {text}")
@@ -128,68 +110,165 @@ class AmazonPriceMonitor:
         alert_message = f"\n{'='*50}\n{title}\n{message}\n{'='*50}"
         logger.info(alert_message)
 
+    def restore_state(self, now=None):
+        """Load the last checkpoint and spread overdue checks across one interval"""
+        now = time.time() if now is None else now
+        saved = self.state_store.load()
+        for product in self.products:
+            product.state = saved.get(product.url, ProductState())
+
+        overdue = [product.state for product in self.products if product.state.next_due <= now]
+        overdue.sort(key=lambda state: state.next_due)
+        if overdue:
+            spacing = self.check_interval / len(overdue)
+            for i, state in enumerate(overdue):
+                state.next_due = now + i * spacing
+        self.products.reschedule_all()
+
+        restored = sum(1 for product in self.products if product.url in saved)
+        logger.info(f"Restored state for {restored}/{len(self.products)} products, "
+                    f"{len(overdue)} checks spread over {self.check_interval} seconds")
+
+    def save_state(self):
+        """Checkpoint per-product state to disk"""
+        self.state_store.save({product.url: product.state for product in self.products})
+
+    def schedule_next(self, state, now):
+        """Set when a product is next due, backing off exponentially while it keeps failing"""
+        delay = min(self.check_interval * (2 ** state.failures), config.MAX_BACKOFF)
+        state.next_due = now + delay
+
+    def record_success(self, state, price, in_stock, etag, now):
+        state.last_price = price
+        state.in_stock = in_stock
+        state.etag = etag or state.etag
+        state.last_check = now
+        state.failures = 0
+        self.schedule_next(state, now)
+
+    def record_failure(self, state, now, backoff=True):
+        """Record a failed check; only network errors and throttling back off"""
+        state.last_check = now
+        # Parse failures (e.g. an out-of-stock page without a price) keep the normal interval
+        state.failures = state.failures + 1 if backoff else 0
+        self.schedule_next(state, now)
+
+    def evaluate_price(self, product, current_price, in_stock):
+        """Send an alert if the product is in stock at or below its target price"""
+        logger.info(f"Current price: €{current_price:.2f}, Target: €{product.target_price:.2f}")
+
+        if in_stock and current_price <= product.target_price:
+            self.send_alert(
+                "Price Alert!",
+                f"Product is available at €{current_price:.2f}\nTarget price: €{product.target_price:.2f}\nURL: {product.url}"
+            )
+            return True
+        return False
+
     def check_price(self, product):
         """Check price for a single product"""
+        state = product.state
         retry_count = 0
         max_retries = 3
         retry_delay = 5  # seconds
+        network_error = False
 
         while retry_count < max_retries and not self.stop_monitoring:
             try:
-                response = self.session.get(product['url'], timeout=10)
+                headers = {'If-None-Match': state.etag} if state.etag else None
+                response = self.client.get(product.url, timeout=10, headers=headers)
                 response.raise_for_status()
+                if is_throttled(response):
+                    # Captcha pages come back as HTTP 200; they are throttling, not a missing price
+                    raise requests.exceptions.HTTPError("Throttled: captcha page", response=response)
 
-                if response.status_code == 200:
-                    current_price = self.extract_price(response.text)
+                if response.status_code == 304 and state.last_price is not None:
+                    logger.debug(f"Page not modified since last check: {product.url}")
+                    current_price, in_stock = state.last_price, state.in_stock
+                elif response.status_code == 200:
+                    current_price = self.extract_price(response.text, product.url)
                     in_stock = self.check_stock(response.text)
+                else:
+                    break
 
-                    logger.info(f"Current price: €{current_price:.2f}, Target: €{product['target_price']:.2f}")
-
-                    if in_stock and current_price <= product['target_price']:
-                        self.send_alert(
-                            "Price Alert!",
-                            f"Product is available at €{current_price:.2f}\nTarget price: €{product['target_price']:.2f}\nURL: {product['url']}"
-                        )
-                        return True
-                    break  # Success, exit retry loop
+                now = time.time()
+                self.record_success(state, current_price, in_stock, response.headers.get('ETag'), now)
+                self.history.record(product.url, current_price, in_stock, now)
+                return self.evaluate_price(product, current_price, in_stock)
 
             except requests.exceptions.RequestException as e:
+                network_error = True  # Includes throttling: 429/503 via raise_for_status, or a captcha page
                 logger.error(f"Network error (attempt {retry_count + 1}/{max_retries}): {e}")
                 if retry_count + 1 < max_retries:
                     time.sleep(retry_delay)
             except ValueError as e:
+                network_error = False
                 logger.error(f"Parsing error: {e}")
                 break  # Don't retry parsing errors
             except Exception as e:
+                network_error = False
                 logger.error(f"Unexpected error: {e}")
                 break
 
             retry_count += 1
 
+        if self.stop_monitoring:
+            return False  # Interrupted by a stop, not a failure of the product
+        self.record_failure(state, time.time(), backoff=network_error)
         return False
 
+    def check_and_schedule(self, product):
+        """Check one due product on a worker thread and queue it again"""
+        try:
+            self.check_price(product)
+        except Exception as e:
+            logger.error(f"Error checking product {product.url}: {e}")
+            self.record_failure(product.state, time.time(), backoff=False)
+        self.products.schedule(product)
+
     def monitor_prices(self):
         """Main monitoring loop"""
         logger.info("Starting Amazon Price Monitor...")
         logger.info(f"Monitoring {len(self.products)} products")
 
-        check_interval = 60  # seconds between checks
+        self.restore_state()
+        last_checkpoint = time.time()
+        # One worker per pooled session, so each in-flight request has its own identity
+        workers = ThreadPoolExecutor(max_workers=config.SESSION_POOL_SIZE, thread_name_prefix='price-check')
 
         while not self.stop_monitoring:
-            logger.info(f"\nChecking prices at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            now = time.time()
+            due = self.products.pop_due(now)
 
-            for product in self.products:
-                if self.stop_monitoring:
-                    break
-                try:
-                    self.check_price(product)
-                except Exception as e:
-                    logger.error(f"Error checking product {product['url']}: {e}")
+            if due:
+                logger.info(f"\nChecking {len(due)} prices at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+            # Products are out of the queue until their check finishes, so none is checked twice at once
+            for product in due:
+                workers.submit(self.check_and_schedule, product)
+
+            if time.time() - last_checkpoint >= config.CHECKPOINT_INTERVAL:
+                self.save_state()
+                last_checkpoint = time.time()
 
             if not self.stop_monitoring:
-                logger.info(f"Waiting {check_interval} seconds before next check...")
-                time.sleep(check_interval)
+                next_due = self.products.earliest_due()
+                if next_due is None:
+                    next_due = now + self.check_interval
+                wait = max(0.0, next_due - time.time())
+                if due and wait > 0:
+                    logger.info(f"Waiting {wait:.0f} seconds before next check...")
+                # Sleep in short steps so a stop request is honoured promptly
+                deadline = time.time() + min(wait, config.CHECKPOINT_INTERVAL)
+                while not self.stop_monitoring and time.time() < deadline:
+                    time.sleep(min(1.0, deadline - time.time()))
 
+        workers.shutdown(wait=True, cancel_futures=True)
+        self.save_state()
+        self.client.close()
+        selector_report = self.price_selectors.report()
+        if selector_report:
+            logger.info(f"Price selector statistics:\n{selector_report}")
         logger.info("Price monitoring stopped")
 
 if __name__ == "__main__":
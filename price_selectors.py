@@ -0,0 +1,180 @@
+import collections
+import logging
+import threading
+from urllib.parse import urlparse
+
+import soupsieve
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Price selectors that Amazon commonly uses, in their default priority
+PRICE_SELECTORS = [
+    '.a-price .a-offscreen',
+    '#priceblock_ourprice',
+    '#priceblock_dealprice',
+    '.a-price .a-price-whole',
+    '#corePrice_feature_div .a-price-whole',
+    '#price_inside_buybox',
+    '.a-size-medium.a-color-price',
+    '.price3P',
+    '#sns-base-price'
+]
+
+# Stock status selectors, always tried in this order
+STOCK_SELECTORS = [
+    '#availability',
+    '#outOfStock',
+    '#availability-string',
+    '#buybox-availability'
+]
+
+
+def compile_selectors(selectors):
+    """Parse CSS selectors once so pages are only matched, never re-parsed"""
+    return [(selector, soupsieve.compile(selector)) for selector in selectors]
+
+
+def marketplace_for(url):
+    """Marketplace key for a product URL, e.g. 'www.amazon.de'"""
+    return (urlparse(url).hostname or 'default') if url else 'default'
+
+
+class MarketplaceStats:
+    """Decayed hit scores per selector and the recent extraction hit rate for one marketplace"""
+
+    def __init__(self, compiled, window):
+        self.scores = {selector: 0.0 for selector, _ in compiled}
+        self.order = list(compiled)
+        self.recent = collections.deque(maxlen=window)
+        self.baseline = None
+        self.degraded = False
+        self.pages = 0
+        self.confirmed = {selector: 0 for selector, _ in compiled}  # Clean confirmations per selector
+
+    @property
+    def hit_rate(self):
+        return sum(self.recent) / len(self.recent) if self.recent else None
+
+
+class SelectorRanker:
+    """Compiled price selectors, tried in order of their observed hit rate per marketplace.
+
+    Several selectors can match the same page with different prices. A selector promoted
+    above its default priority is only trusted once higher-priority selectors have agreed
+    with it (or not matched) on several pages; after that they are re-checked on a sample
+    of pages, and a disagreement makes the default priority decide again until it is trusted.
+    """
+
+    def __init__(self, selectors=PRICE_SELECTORS, decay=config.SELECTOR_SCORE_DECAY,
+                 window=config.SELECTOR_WINDOW, drop_threshold=config.SELECTOR_HIT_RATE_DROP,
+                 confirm_pages=config.SELECTOR_CONFIRM_PAGES, recheck_every=config.SELECTOR_RECHECK_EVERY):
+        self.compiled = compile_selectors(selectors)
+        self.priority = {selector: i for i, (selector, _) in enumerate(self.compiled)}
+        self.decay = decay
+        self.window = window
+        self.drop_threshold = drop_threshold
+        self.confirm_pages = confirm_pages
+        self.recheck_every = recheck_every
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def ordered(self, marketplace):
+        """Compiled selectors for a marketplace, most successful first"""
+        stats = self._stats.get(marketplace)
+        return self.compiled if stats is None else stats.order
+
+    def _trusted(self, stats, selector):
+        if stats is None or stats.confirmed[selector] < self.confirm_pages:
+            return False
+        return (stats.pages + 1) % self.recheck_every != 0  # This page is number pages + 1
+
+    def find(self, soup, marketplace, parse):
+        """Return (selector, value) of the first ranked selector whose element parse() accepts"""
+        stats = self._stats.get(marketplace)
+        missed = set()
+        for selector, compiled in self.ordered(marketplace):
+            value = parse(selector, compiled.select_one(soup))
+            if value is None:
+                missed.add(selector)
+                continue
+            if self._trusted(stats, selector):
+                return selector, value
+
+            # Confirm against the highest-priority selector that has not missed yet
+            for higher, higher_compiled in self.compiled[:self.priority[selector]]:
+                if higher in missed:
+                    continue
+                higher_value = parse(higher, higher_compiled.select_one(soup))
+                if higher_value is None:
+                    missed.add(higher)
+                    continue
+                if higher_value != value:
+                    self._confirm(stats, selector, False)
+                    return higher, higher_value
+                break
+            self._confirm(stats, selector, True)
+            return selector, value
+
+        return None, None
+
+    def _confirm(self, stats, selector, agreed):
+        if stats is None:
+            return
+        with self._lock:
+            was_trusted = stats.confirmed[selector] >= self.confirm_pages
+            stats.confirmed[selector] = stats.confirmed[selector] + 1 if agreed else 0
+        if was_trusted and not agreed:
+            logger.info(f"Price selector {selector} disagreed with a higher-priority selector; confirming it again")
+
+    def record(self, marketplace, selector):
+        """Record which selector found the price, or None if none did"""
+        with self._lock:
+            stats = self._stats.get(marketplace)
+            if stats is None:
+                stats = self._stats[marketplace] = MarketplaceStats(self.compiled, self.window)
+
+            stats.pages += 1
+            for name in stats.scores:
+                stats.scores[name] *= self.decay
+            if selector is not None:
+                stats.scores[selector] += 1.0
+                # Stable sort keeps the default priority between equally scored selectors
+                stats.order = sorted(self.compiled, key=lambda item: -stats.scores[item[0]])
+
+            stats.recent.append(selector is not None)
+            self._check_hit_rate(marketplace, stats)
+
+    def _check_hit_rate(self, marketplace, stats):
+        if len(stats.recent) < stats.recent.maxlen:
+            return
+        rate = stats.hit_rate
+        if stats.baseline is None:
+            stats.baseline = rate
+            return
+
+        if not stats.degraded and stats.baseline - rate >= self.drop_threshold:
+            stats.degraded = True
+            logger.warning(
+                f"Price selector hit rate on {marketplace} dropped from {stats.baseline:.0%} to {rate:.0%} "
+                f"over the last {len(stats.recent)} pages - the page layout may have changed"
+            )
+        elif stats.degraded and stats.baseline - rate < self.drop_threshold / 2:
+            stats.degraded = False
+            logger.info(f"Price selector hit rate on {marketplace} recovered to {rate:.0%}")
+
+        # Only learn the baseline from healthy periods so a layout change is not absorbed into it
+        if not stats.degraded:
+            stats.baseline += (rate - stats.baseline) / self.window
+
+    def report(self):
+        """Per-marketplace hit rate and selector order"""
+        lines = []
+        with self._lock:
+            for marketplace, stats in sorted(self._stats.items()):
+                status = "DEGRADED" if stats.degraded else "ok"
+                lines.append(f"{marketplace}: hit rate {stats.hit_rate:.0%} ({status})")
+                for selector, _ in stats.order:
+                    lines.append(f"   {stats.scores[selector]:7.2f}  {selector}")
+        return '\n'.join(lines)
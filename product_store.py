@@ -0,0 +1,241 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+
+from monitor_state import ProductState
+
+# Matches the 10-character product id in /dp/, /gp/product/ and mobile URLs
+ASIN_PATTERN = re.compile(r'/(?:dp|gp/product|gp/aw/d|o/ASIN)/([A-Z0-9]{10})(?:[/?#]|$)')
+
+# Column encodings for values that may be unknown
+UNKNOWN_STOCK = -1
+MISSING = math.nan
+
+
+def extract_asin(url):
+    """Get the ASIN from an Amazon product URL, or None if it has none"""
+    match = ASIN_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def _optional_float(value):
+    return None if math.isnan(value) else value
+
+
+class StateView:
+    """ProductState interface backed by one row of a ProductCatalog's columns"""
+
+    __slots__ = ('_catalog', '_row')
+
+    def __init__(self, catalog, row):
+        self._catalog = catalog
+        self._row = row
+
+    @property
+    def last_price(self):
+        return _optional_float(self._catalog.last_prices[self._row])
+
+    @last_price.setter
+    def last_price(self, value):
+        self._catalog.last_prices[self._row] = MISSING if value is None else value
+
+    @property
+    def in_stock(self):
+        value = self._catalog.in_stock[self._row]
+        return None if value == UNKNOWN_STOCK else bool(value)
+
+    @in_stock.setter
+    def in_stock(self, value):
+        self._catalog.in_stock[self._row] = UNKNOWN_STOCK if value is None else int(bool(value))
+
+    @property
+    def last_check(self):
+        return _optional_float(self._catalog.last_checks[self._row])
+
+    @last_check.setter
+    def last_check(self, value):
+        self._catalog.last_checks[self._row] = MISSING if value is None else value
+
+    @property
+    def next_due(self):
+        return self._catalog.next_due[self._row]
+
+    @next_due.setter
+    def next_due(self, value):
+        self._catalog.next_due[self._row] = value
+
+    @property
+    def etag(self):
+        return self._catalog.etags.get(self._row)
+
+    @etag.setter
+    def etag(self, value):
+        if value is None:
+            self._catalog.etags.pop(self._row, None)
+        else:
+            self._catalog.etags[self._row] = value
+
+    @property
+    def failures(self):
+        return self._catalog.failures[self._row]
+
+    @failures.setter
+    def failures(self, value):
+        self._catalog.failures[self._row] = value
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in ProductState.FIELDS}
+
+
+class Product:
+    """A monitored product: a lightweight view of one catalog row"""
+
+    __slots__ = ('_catalog', 'row')
+
+    def __init__(self, catalog, row):
+        self._catalog = catalog
+        self.row = row
+
+    @property
+    def url(self):
+        return self._catalog.urls[self.row]
+
+    @property
+    def target_price(self):
+        return self._catalog.target_prices[self.row]
+
+    @property
+    def asin(self):
+        return extract_asin(self.url)
+
+    @property
+    def state(self):
+        return StateView(self._catalog, self.row)
+
+    @state.setter
+    def state(self, state):
+        """Copy a standalone ProductState (e.g. from a checkpoint) into this row"""
+        view = self.state
+        for field in ProductState.FIELDS:
+            setattr(view, field, getattr(state, field))
+
+    def to_dict(self):
+        return {'url': self.url, 'target_price': self.target_price}
+
+
+class ProductCatalog:
+    """Watchlist stored as typed array columns, with an ASIN index and a due-time wheel"""
+
+    def __init__(self):
+        self.urls = []
+        self.target_prices = array('d')
+        self.last_prices = array('d')
+        self.last_checks = array('d')
+        self.next_due = array('d')
+        self.in_stock = array('b')
+        self.failures = array('H')
+        self.etags = {}  # Sparse: row -> ETag, most pages do not send one
+        self._by_asin = {}
+        # Timing wheel: whole second -> rows due in that second, plus a heap of pending seconds
+        self._buckets = {}
+        self._bucket_keys = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_list(cls, data):
+        """Build a catalog from the products.json format"""
+        catalog = cls()
+        for item in data:
+            catalog.add(item['url'], item['target_price'])
+        return catalog
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __iter__(self):
+        return (Product(self, row) for row in range(len(self.urls)))
+
+    def __getitem__(self, row):
+        return Product(self, range(len(self.urls))[row])
+
+    def add(self, url, target_price):
+        """Add a product, due immediately, and return it"""
+        with self._lock:
+            row = len(self.urls)
+            self.target_prices.append(float(target_price))
+            self.last_prices.append(MISSING)
+            self.last_checks.append(MISSING)
+            self.next_due.append(0.0)
+            self.in_stock.append(UNKNOWN_STOCK)
+            self.failures.append(0)
+            asin = extract_asin(url)
+            if asin:
+                self._by_asin[asin] = row
+            self.urls.append(url)  # Last, so readers never see a partially added row
+            self._push(row)
+        return Product(self, row)
+
+    def get(self, asin):
+        """Look up a product by ASIN"""
+        row = self._by_asin.get(asin)
+        return None if row is None else Product(self, row)
+
+    def to_list(self):
+        return [{'url': url, 'target_price': price} for url, price in zip(self.urls, self.target_prices)]
+
+    def _push(self, row):
+        key = math.floor(self.next_due[row])
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = array('l')
+            heapq.heappush(self._bucket_keys, key)
+        bucket.append(row)
+
+    def schedule(self, product):
+        """Queue a product again after its next_due time changed"""
+        with self._lock:
+            self._push(product.row)
+
+    def reschedule_all(self):
+        """Rebuild the queue after many next_due times changed at once"""
+        with self._lock:
+            self._buckets = {}
+            self._bucket_keys = []
+            for row in range(len(self.urls)):
+                self._push(row)
+
+    def pop_due(self, now):
+        """Remove and return every product due at or before now, earliest second first"""
+        due = []
+        with self._lock:
+            while self._bucket_keys and self._bucket_keys[0] <= now:
+                key = heapq.heappop(self._bucket_keys)
+                later = array('l')
+                seen = set()
+                for row in self._buckets.pop(key):
+                    if row in seen or math.floor(self.next_due[row]) != key:
+                        continue  # Duplicate or stale entry: the row was rescheduled elsewhere
+                    seen.add(row)
+                    if self.next_due[row] <= now:
+                        due.append(Product(self, row))
+                    else:
+                        later.append(row)
+                if later:
+                    self._buckets[key] = later
+                    heapq.heappush(self._bucket_keys, key)
+                    break
+        return due
+
+    def earliest_due(self):
+        """Earliest pending due time, or None if nothing is queued"""
+        with self._lock:
+            while self._bucket_keys:
+                key = self._bucket_keys[0]
+                pending = [self.next_due[row] for row in self._buckets[key] if math.floor(self.next_due[row]) == key]
+                if pending:
+                    return min(pending)
+                heapq.heappop(self._bucket_keys)  # Only stale entries left in this second
+                del self._buckets[key]
+        return None
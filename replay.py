@@ -0,0 +1,276 @@
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import sys
+import time
+from array import array
+from datetime import datetime
+
+import config
+from price_history import PriceHistory
+from price_monitor import AmazonPriceMonitor, logger as monitor_logger
+from product_store import ProductCatalog
+
+logger = logging.getLogger(__name__)
+
+# "2025-03-12 09:54:42,595 - INFO - Current price: $199.00, Target: $29.99"
+# Any single currency character is accepted, so a mis-decoded € still matches
+LOG_PATTERN = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) - INFO - Current price: [^\d\s]([\d.]+), Target: [^\d\s]([\d.]+)'
+)
+
+# Check intervals (in seconds) compared when none are given; each simulated check costs ~13 µs,
+# so short intervals over long histories are slow (60s over a month of 1,000 products is ~10 minutes)
+DEFAULT_INTERVALS = [300, 900, 3600]
+
+
+class Timeline:
+    """Recorded prices of one product, read as a step function of time"""
+
+    __slots__ = ('times', 'prices', 'in_stock')
+
+    def __init__(self):
+        self.times = array('d')
+        self.prices = array('d')
+        self.in_stock = array('b')
+
+    def append(self, timestamp, price, in_stock):
+        self.times.append(timestamp)
+        self.prices.append(price)
+        self.in_stock.append(int(bool(in_stock)))
+
+    def at(self, timestamp):
+        """(price, in_stock) in effect at a time, or None before the first observation"""
+        i = bisect.bisect_right(self.times, timestamp) - 1
+        if i < 0:
+            return None
+        return self.prices[i], bool(self.in_stock[i])
+
+
+class OfflineClient:
+    """Stands in for SessionPool so a replay can never touch the network"""
+
+    def get(self, url, timeout=10, headers=None):
+        raise RuntimeError("Network access is disabled during replay")
+
+    def close(self):
+        pass
+
+
+def build_timelines(observations):
+    """Group (timestamp, key, price, in_stock) observations into time-ordered timelines"""
+    timelines = {}
+    for timestamp, key, price, in_stock in sorted(observations, key=lambda o: (o[1], o[0])):
+        timeline = timelines.get(key)
+        if timeline is None:
+            timeline = timelines[key] = Timeline()
+        timeline.append(timestamp, price, in_stock)
+    return timelines
+
+
+def load_history(path, products_path='products.json'):
+    """Observations from a price history CSV, with target prices from the products file"""
+    targets = {}
+    if products_path and os.path.exists(products_path):
+        with open(products_path, 'r') as f:
+            targets = {item['url']: item['target_price'] for item in json.load(f)}
+    observations = PriceHistory(path).load()
+    for _, url, _, _ in observations:
+        targets.setdefault(url, 0.0)  # Unknown target: replay still measures drops, never alerts
+    return observations, targets
+
+
+def _decode_log_line(raw):
+    """Decode a log line as UTF-8, falling back to cp1252 (what FileHandler writes on Windows)"""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('cp1252', errors='replace')
+
+
+def parse_log(path):
+    """Observations from price_alerts.log 'Current price' lines.
+
+    Log lines do not name the product, so products are told apart by their target price.
+    The log has no stock information; products are assumed to be in stock.
+    """
+    observations = []
+    targets = {}
+    skipped = 0
+    with open(path, 'rb') as f:
+        for raw in f:
+            line = _decode_log_line(raw)
+            match = LOG_PATTERN.match(line)
+            if not match:
+                if 'Current price:' in line:
+                    skipped += 1
+                continue
+            stamp, millis, price, target = match.groups()
+            timestamp = datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').timestamp() + int(millis) / 1000
+            key = f"log:target={target}"
+            targets[key] = float(target)
+            observations.append((timestamp, key, float(price), True))
+    if skipped:
+        logger.warning(f"Skipped {skipped} unreadable 'Current price' lines in {path}")
+    return observations, targets
+
+
+class ReplayResult:
+    """Requests spent and price drops caught by one scheduling policy"""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.requests = 0
+        self.alerts = 0
+        self.drops = 0
+        self.caught = 0
+        self.target_drops = 0
+        self.target_caught = 0
+        self.delays = []
+        self.wall_time = 0.0
+
+    @property
+    def median_delay(self):
+        if not self.delays:
+            return None
+        ordered = sorted(self.delays)
+        return ordered[len(ordered) // 2]
+
+    @property
+    def mean_delay(self):
+        return sum(self.delays) / len(self.delays) if self.delays else None
+
+    def summary(self):
+        def minutes(seconds):
+            return f"{seconds / 60:8.1f}" if seconds is not None else f"{'-':>8}"
+
+        return (
+            f"{self.policy:<14} {self.requests:>10,} {self.caught:>7,}/{self.drops:<7,} "
+            f"{self.target_caught:>5,}/{self.target_drops:<5,} {minutes(self.median_delay)} "
+            f"{minutes(self.mean_delay)} {self.alerts:>8,} {self.wall_time:7.2f}s"
+        )
+
+
+SUMMARY_HEADER = (
+    f"{'Policy':<14} {'Requests':>10} {'Drops caught':>15} {'Target':>11} {'Median':>8} "
+    f"{'Mean':>8} {'Alerts':>8} {'Replay':>8}\n"
+    f"{'':<14} {'':>10} {'':>15} {'hits':>11} {'delay(m)':>8} {'delay(m)':>8} {'':>8} {'time':>8}"
+)
+
+
+def replay(timelines, targets, check_interval, name=None, monitor_class=AmazonPriceMonitor):
+    """Run the monitor's scheduling and alert logic over recorded timelines in simulated time"""
+    keys = sorted(timelines)
+    result = ReplayResult(name or f"every {check_interval}s")
+    if not keys:
+        return result
+    started = time.perf_counter()
+
+    monitor = monitor_class(client=OfflineClient(), state_path=None, history_path=None)
+    monitor.check_interval = check_interval
+    monitor.products = ProductCatalog.from_list([{'url': key, 'target_price': targets[key]} for key in keys])
+    rows = [timelines[key] for key in keys]
+    check_times = [array('d') for _ in keys]
+    start = min(timeline.times[0] for timeline in rows)
+    end = max(timeline.times[-1] for timeline in rows)
+
+    was_disabled = monitor_logger.disabled
+    monitor_logger.disabled = True  # Keep millions of simulated checks out of the alert log
+    try:
+        monitor.restore_state(now=start)
+        # Keep the cold-start spread, but start each product when its own history begins
+        for product in monitor.products:
+            state = product.state
+            state.next_due = rows[product.row].times[0] + (state.next_due - start)
+        monitor.products.reschedule_all()
+
+        next_due = monitor.products.earliest_due()
+        while next_due is not None and next_due <= end:
+            # Take everything due within this second in one batch; each check still runs at its own due time
+            for product in monitor.products.pop_due(math.floor(next_due) + 1):
+                state = product.state
+                now = state.next_due
+                price, in_stock = rows[product.row].at(now)
+                check_times[product.row].append(now)
+                result.requests += 1
+                monitor.record_success(state, price, in_stock, None, now)
+                if monitor.evaluate_price(product, price, in_stock):
+                    result.alerts += 1
+                monitor.products.schedule(product)
+            next_due = monitor.products.earliest_due()
+    finally:
+        monitor_logger.disabled = was_disabled
+
+    for key, timeline, checks in zip(keys, rows, check_times):
+        _score_drops(result, timeline, checks, targets[key], end)
+    result.wall_time = time.perf_counter() - started
+    return result
+
+
+def _score_drops(result, timeline, checks, target, end):
+    """A drop is caught if any check falls inside the period the lower price was in effect"""
+    times, prices = timeline.times, timeline.prices
+    # Index of the next observation with a different price; repeated observations of a price extend its period
+    next_change = [len(times)] * len(times)
+    for i in range(len(times) - 2, -1, -1):
+        next_change[i] = i + 1 if prices[i + 1] != prices[i] else next_change[i + 1]
+
+    for i in range(1, len(times)):
+        if prices[i] >= prices[i - 1]:
+            continue
+        hits_target = prices[i] <= target < prices[i - 1] and timeline.in_stock[i]
+        result.drops += 1
+        result.target_drops += hits_target
+        j = bisect.bisect_left(checks, times[i])
+        if j == len(checks):
+            continue
+        k = next_change[i]
+        if k < len(times):
+            # A check at exactly the next price change already sees the new price (Timeline.at)
+            caught = checks[j] < times[k]
+        else:
+            caught = checks[j] <= end
+        if caught:
+            result.caught += 1
+            result.target_caught += hits_target
+            result.delays.append(checks[j] - times[i])
+
+
+def backtest(observations, targets, intervals=DEFAULT_INTERVALS):
+    """Replay the same observations under several check intervals"""
+    timelines = build_timelines(observations)
+    return [replay(timelines, targets, interval) for interval in intervals]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded prices through the monitor's scheduling and alert logic")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--history', default=config.HISTORY_FILE, help="price history CSV (default: %(default)s)")
+    source.add_argument('--log', help="parse observations from a price_alerts.log file instead")
+    parser.add_argument('--products', default='products.json', help="target prices for history replays")
+    parser.add_argument('--intervals', type=int, nargs='+', default=DEFAULT_INTERVALS,
+                        help="check intervals in seconds to compare")
+    args = parser.parse_args()
+
+    if args.log:
+        observations, targets = parse_log(args.log)
+    else:
+        observations, targets = load_history(args.history, args.products)
+    if not observations:
+        print("No observations to replay")
+        return 1
+
+    print(f"Replaying {len(observations):,} observations of {len(targets):,} products\n")
+    print(SUMMARY_HEADER)
+    for result in backtest(observations, targets, args.intervals):
+        print(result.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    sys.exit(main())
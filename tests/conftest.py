@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# price_monitor logs to price_alerts.log in the working directory on import; keep test runs out of the real log
+os.chdir(tempfile.mkdtemp(prefix='price-monitor-tests-'))
@@ -0,0 +1,36 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from price_analytics import PriceAnalytics
+
+
+@pytest.fixture
+def berlin_time(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Berlin')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_hour_buckets_follow_daylight_saving(berlin_time):
+    # Both drops happen at 12:00 Berlin time: 11:00 UTC in winter, 10:00 UTC in summer
+    timestamps = [utc(2025, 1, 15, 8), utc(2025, 1, 15, 11), utc(2025, 7, 15, 6), utc(2025, 7, 15, 10)]
+    analytics = PriceAnalytics(timestamps, ['product'] * 4, [10.0, 5.0, 10.0, 5.0], now=utc(2025, 7, 16))
+
+    assert analytics.drops[0] == 2
+    assert analytics.drops_by_hour[0, 12] == 2
+
+
+def test_fixed_utc_offset(berlin_time):
+    timestamps = [utc(2025, 1, 15, 8), utc(2025, 1, 15, 11), utc(2025, 7, 15, 6), utc(2025, 7, 15, 10)]
+    analytics = PriceAnalytics(timestamps, ['product'] * 4, [10.0, 5.0, 10.0, 5.0], now=utc(2025, 7, 16), utc_offset=0)
+
+    assert analytics.drops_by_hour[0, 11] == 1
+    assert analytics.drops_by_hour[0, 10] == 1
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+import config
+import price_monitor
+from price_monitor import AmazonPriceMonitor
+from product_store import ProductCatalog
+
+URL = 'https://www.amazon.de/dp/B000000001'
+PRICE_PAGE = '<span class="a-price"><span class="a-offscreen">€9.99</span></span>'
+CAPTCHA_PAGE = '<form action="/errors/validateCaptcha">Type the characters you see in this image</form>'
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeClient:
+    def __init__(self, text):
+        self.text = text
+        self.requests = 0
+
+    def get(self, url, timeout=10, headers=None):
+        self.requests += 1
+        return FakeResponse(self.text)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monkeypatch.setattr(price_monitor.time, 'sleep', lambda seconds: None)
+
+    def make(text):
+        monitor = AmazonPriceMonitor(client=FakeClient(text), state_path=None, history_path=None)
+        monitor.products = ProductCatalog.from_list([{'url': URL, 'target_price': 10.0}])
+        return monitor
+    return make
+
+
+def test_captcha_page_backs_off_without_a_selector_miss(monitor):
+    monitor = monitor(CAPTCHA_PAGE)
+    product = monitor.products[0]
+
+    assert monitor.check_price(product) is False
+    assert product.state.failures == 1
+    assert product.state.next_due - product.state.last_check == monitor.check_interval * 2
+    assert monitor.client.requests == 3  # Retried like other throttling
+    assert monitor.price_selectors.report() == ''  # No page was counted as a layout miss
+
+
+def no_price(html_content, url=None):
+    raise ValueError("Could not find price element on the page after trying multiple methods")
+
+
+def test_page_without_price_keeps_normal_interval(monitor):
+    monitor = monitor('<html><body>Currently unavailable</body></html>')
+    monitor.extract_price = no_price  # Skip the trafilatura fallback, which fetches the page again
+    product = monitor.products[0]
+
+    assert monitor.check_price(product) is False
+    assert product.state.failures == 0
+    assert product.state.next_due - product.state.last_check == monitor.check_interval
+
+
+class SlowClient:
+    """Answers every request after a delay and records the most requests in flight at once"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=10, headers=None):
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return FakeResponse(PRICE_PAGE)
+
+    def close(self):
+        pass
+
+
+def test_due_products_are_checked_concurrently():
+    client = SlowClient()
+    monitor = AmazonPriceMonitor(client=client, state_path=None, history_path='price_history.csv')
+    monitor.products = ProductCatalog.from_list(
+        [{'url': f'https://www.amazon.de/dp/B{i:09d}', 'target_price': 5.0} for i in range(config.SESSION_POOL_SIZE * 2)]
+    )
+    monitor.check_interval = 0.01  # Every product is due right after the cold start
+
+    thread = threading.Thread(target=monitor.monitor_prices)
+    thread.start()
+    deadline = time.time() + 5
+    while client.requests < len(monitor.products) and time.time() < deadline:
+        time.sleep(0.01)
+    monitor.stop_monitoring = True
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert client.requests >= len(monitor.products)
+    assert client.max_active == config.SESSION_POOL_SIZE
+    assert all(product.state.last_price == 9.99 for product in monitor.products)
@@ -0,0 +1,62 @@
+from bs4 import BeautifulSoup
+
+from price_selectors import SelectorRanker
+
+CORE_PRICE_PAGE = '<div id="corePrice_feature_div"><span class="a-price-whole">19.99</span></div>'
+DEAL_PAGE = CORE_PRICE_PAGE + '<span class="a-price"><span class="a-offscreen">14.99</span></span>'
+
+
+class CountingSelector:
+    """Wraps a compiled selector and counts select_one calls"""
+
+    calls = 0
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+
+    def select_one(self, soup):
+        CountingSelector.calls += 1
+        return self.compiled.select_one(soup)
+
+
+def parse(selector, element):
+    return float(element.get_text()) if element else None
+
+
+def counting_ranker(**kwargs):
+    ranker = SelectorRanker(**kwargs)
+    ranker.compiled = [(selector, CountingSelector(compiled)) for selector, compiled in ranker.compiled]
+    return ranker
+
+
+def extract(ranker, html, marketplace='www.amazon.de'):
+    CountingSelector.calls = 0
+    selector, price = ranker.find(BeautifulSoup(html, 'html.parser'), marketplace, parse)
+    ranker.record(marketplace, selector)
+    return price, CountingSelector.calls
+
+
+def test_ranking_reduces_select_one_calls():
+    ranker = counting_ranker(confirm_pages=10, recheck_every=25)
+    calls = [extract(ranker, CORE_PRICE_PAGE) for _ in range(20)]
+
+    assert all(price == 19.99 for price, _ in calls)
+    assert calls[0][1] == 5  # Default order: four misses before the core price selector
+    assert [count for _, count in calls[-5:]] == [1] * 5
+
+
+def test_disagreeing_higher_priority_selector_wins_on_recheck():
+    ranker = counting_ranker(confirm_pages=10, recheck_every=25)
+    for _ in range(24):
+        extract(ranker, CORE_PRICE_PAGE)
+
+    # The 25th page is re-checked, so the default priority decides the price again
+    assert extract(ranker, DEAL_PAGE)[0] == 14.99
+    assert extract(ranker, DEAL_PAGE)[0] == 14.99
+
+
+def test_unconfirmed_promoted_selector_defers_to_default_priority():
+    ranker = counting_ranker(confirm_pages=10, recheck_every=25)
+    for _ in range(3):
+        extract(ranker, CORE_PRICE_PAGE)
+    assert extract(ranker, DEAL_PAGE)[0] == 14.99
@@ -0,0 +1,35 @@
+from array import array
+
+from replay import ReplayResult, Timeline, _score_drops, backtest
+
+
+def test_drop_spanning_repeated_observations_is_caught():
+    # Sampled every 60s like live price history: 100 until 3h07m, then 50 for about 6h, then back to 100
+    drop_at = 3 * 3600 + 7 * 60
+    recover_at = drop_at + 6 * 3600
+    observations = [
+        (t, 'product', 50.0 if drop_at <= t < recover_at else 100.0, True)
+        for t in range(0, recover_at + 3600, 60)
+    ]
+
+    intervals = [300, 900, 3600]
+    for interval, result in zip(intervals, backtest(observations, {'product': 60.0}, intervals)):
+        assert result.drops == 1
+        assert result.caught == 1
+        assert result.target_caught == 1
+        assert result.alerts > 0
+        assert 0 <= result.delays[0] < interval
+
+
+def test_check_at_recovery_does_not_catch_drop():
+    timeline = Timeline()
+    for timestamp, price in [(0, 100.0), (100, 50.0), (160, 50.0), (200, 100.0)]:
+        timeline.append(timestamp, price, True)
+
+    result = ReplayResult('test')
+    _score_drops(result, timeline, array('d', [0, 200]), 60.0, 200)
+    assert (result.drops, result.caught) == (1, 0)
+
+    result = ReplayResult('test')
+    _score_drops(result, timeline, array('d', [0, 180]), 60.0, 200)
+    assert (result.drops, result.caught, result.delays) == (1, 1, [80])